@@ -0,0 +1,150 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import data
+import ingest
+import metrics
+import settings
+
+
+# Reports without a date range are computed once under this period name
+ALL_TIME = 'all'
+
+# Set in each worker process by _init_worker so the frames are sent once per
+# worker instead of once per task
+_sales_data = None
+_netted_data = None
+
+
+def _init_worker(sales_data, netted_data):
+    global _sales_data, _netted_data
+    _sales_data = sales_data
+    _netted_data = netted_data
+
+
+def vista_general(start, end):
+    filtered_sales_data = metrics.filter_period(_netted_data, start, end)
+    monthly_sales = metrics.monthly_sales(filtered_sales_data)
+    return {
+        'kpis': metrics.overview_kpis(filtered_sales_data),
+        'tables': {
+            'monthly_sales': monthly_sales,
+            'seller_ranking': metrics.seller_ranking(filtered_sales_data),
+            'top_items': metrics.top_items(filtered_sales_data),
+        },
+        'charts': {
+            'monthly_sales': metrics.monthly_sales_chart(monthly_sales).to_json(),
+        },
+    }
+
+
+def cuentas_por_cobrar():
+    receivables = metrics.receivables(_netted_data)
+    return {
+        'kpis': {'due_amount': float(receivables['due'].sum()), 'invoices': int(receivables['invoice_number'].nunique())},
+        'tables': {'receivables': receivables},
+        'charts': {},
+    }
+
+
+def clientes():
+    summary = metrics.client_segments(_sales_data)
+    return {
+        'kpis': {'clients': int(len(summary)), 'avg_distinct_days': float(summary['distinct_days_with_sales'].mean())},
+        'tables': {'summary': summary, 'category_sales': metrics.category_sales(summary)},
+        'charts': {'segments': metrics.client_segments_chart(summary).to_json()},
+    }
+
+
+def productos():
+    # The default view of the page: no category or item filter, full price range
+    sales_data = metrics.product_sales(_sales_data)
+    cumulative_sales = metrics.cumulative_category_sales(metrics.category_month_matrix(sales_data))
+    filtered_data = metrics.filter_products(sales_data, [], [], sales_data['item_unitprice'].min(), sales_data['item_unitprice'].max())
+    return {
+        'kpis': metrics.product_kpis(filtered_data),
+        'tables': {
+            'cumulative_sales': cumulative_sales,
+            'item_summary': metrics.item_summary(filtered_data),
+            'scatter_data': metrics.price_quantity_counts(filtered_data),
+        },
+        'charts': {'cumulative_sales': metrics.cumulative_category_chart(cumulative_sales).to_json()},
+    }
+
+
+def equipo_de_ventas():
+    # The page's seller list: sellers with sales since the start of last year,
+    # the window its figures cover. The figures themselves are computed live.
+    today = pd.Timestamp.now()
+    window = metrics.filter_period(_netted_data, pd.Timestamp(year=today.year - 1, month=1, day=1), today)
+    sellers = pd.DataFrame({'seller_name': sorted(window['seller_name'].dropna().str.upper().unique())})
+    return {
+        'kpis': {'sellers': int(len(sellers))},
+        'tables': {'sellers': sellers},
+        'charts': {},
+    }
+
+
+REPORTS = {
+    'clientes': clientes,
+    'productos': productos,
+    'equipo_de_ventas': equipo_de_ventas,
+    'cuentas_por_cobrar': cuentas_por_cobrar,
+}
+
+
+def _run(task):
+    report, period, date_range = task
+    if report == 'vista_general':
+        result = vista_general(*date_range)
+    else:
+        result = REPORTS[report]()
+    return report, period, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write KPI snapshots for the standard periods')
+    parser.add_argument('--output', default=None, help='snapshot directory (defaults to snapshot_dir in config.json)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--keep-days', type=int, default=None, help='days of snapshots to keep (defaults to snapshot_keep_days in config.json, or 7)')
+    args = parser.parse_args()
+
+    config = settings.load_config()
+    output = args.output or config.get('snapshot_dir', 'snapshots')
+    keep_days = args.keep_days if args.keep_days is not None else config.get('snapshot_keep_days', 7)
+
+    today = pd.Timestamp.today()
+    sales = ingest.load_sales(os.getenv("BASE_URL") + "/sales/details")
+    sales_data, netted_data = sales.raw, sales.netted
+
+    tasks = [('vista_general', period, date_range) for period, date_range in metrics.standard_periods(today).items()]
+    tasks += [(report, ALL_TIME, None) for report in REPORTS]
+
+    # A failing report is reported and skipped; the others are still written
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(sales_data, netted_data)) as executor:
+        futures = {executor.submit(_run, task): task for task in tasks}
+        for future in as_completed(futures):
+            report, period, _ = futures[future]
+            try:
+                _, _, result = future.result()
+                data.write_snapshot(output, today, report, period, result)
+            except Exception as error:
+                failed.append(f'{report}/{period}')
+                print(f'{report}/{period}: failed: {error!r}', file=sys.stderr)
+                continue
+            print(f'{report}/{period}: {len(result["tables"])} tables, {len(result["charts"])} charts')
+
+    # Pages only read today's folder, so older days are only kept for reference
+    for name in data.prune_snapshots(output, today, keep_days):
+        print(f'{name}: removed')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
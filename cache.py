@@ -0,0 +1,106 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def normalize_key(*parts):
+    return tuple(_normalize(part) for part in parts)
+
+
+def _normalize(part):
+    # Multiselect order does not change the result, so lists become sorted
+    # tuples; floats are rounded so slider noise does not create new keys
+    if isinstance(part, (list, tuple, set, frozenset)):
+        return tuple(sorted((_normalize(item) for item in part), key=repr))
+    if isinstance(part, dict):
+        return tuple(sorted((key, _normalize(value)) for key, value in part.items()))
+    if isinstance(part, float):
+        return round(part, 6)
+    return part
+
+
+def size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    # LRU cache for derived tables, bounded by the total size of the cached
+    # values rather than by the number of entries. Cached values are shared
+    # between reruns and sessions, so callers must not modify them in place.
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        nbytes = size_of(value)
+
+        # Values larger than the whole budget are returned but never stored
+        if nbytes > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.size -= evicted_bytes
+                self.evictions += 1
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache(max_bytes):
+    # One cache per process so every page draws from the same memory budget
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache(max_bytes)
+        return _shared_cache
@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+import pandas as pd
+import numpy as np
+
+
+GROUP_COLUMNS = ['issued_at', 'invoice_number', 'seller_name', 'payee_name', 'payee_nit', 'item_name']
+
+
+# Sums and counts instead of means, so partial results can be added together
+PARTIAL_AGGREGATES = {
+    'total_sum': ('total', 'sum'),
+    'total_count': ('total', 'count'),
+    'due_sum': ('due', 'sum'),
+    'due_count': ('due', 'count'),
+    'item_sales': ('item_sales', 'sum'),
+}
+
+
+def partial_net_credit_notes(sales_data):
+    # Net one batch of rows; batches are merged with combine_net_credit_notes
+    # JSON nulls leave all-null columns as object dtype, which sum to Python
+    # ints instead of NaN-aware floats
+    sales_data = sales_data.assign(
+        creditnote_date=pd.to_datetime(sales_data['creditnote_date']),
+        issued_at=pd.to_datetime(sales_data['issued_at']),
+        total=pd.to_numeric(sales_data['total'], errors='coerce'),
+        due=pd.to_numeric(sales_data['due'], errors='coerce'),
+        item_sales=pd.to_numeric(sales_data['item_sales'], errors='coerce')
+    )
+
+    # Summarize where creditnote_date is null
+    summarized_data = (
+        sales_data
+        .groupby(GROUP_COLUMNS, as_index=False)
+        .agg(**PARTIAL_AGGREGATES)
+    )
+
+    # Process where creditnote_date is not null
+    creditnote_data = (
+        sales_data[sales_data['creditnote_date'].notnull()]
+        .assign(
+            issued_at=lambda df: df['creditnote_date'],
+            total=lambda df: df['total'] * -1,
+            item_sales = lambda df: df['item_sales'] * -1 ,
+            due = 0
+        )
+        .groupby(GROUP_COLUMNS, as_index=False)
+        .agg(**PARTIAL_AGGREGATES)
+    )
+
+    return summarized_data, creditnote_data
+
+
+def _finish_partials(partials):
+    combined = pd.concat(partials, ignore_index=True).groupby(GROUP_COLUMNS, as_index=False).sum()
+    # Groups without a single non-null value average to NaN, as mean() did
+    combined['total'] = combined['total_sum'].div(combined['total_count'].where(lambda count: count > 0))
+    combined['due'] = combined['due_sum'].div(combined['due_count'].where(lambda count: count > 0))
+    return combined[GROUP_COLUMNS + ['total', 'due', 'item_sales']]
+
+
+def combine_net_credit_notes(partials):
+    summarized_data = _finish_partials([summarized for summarized, _ in partials])
+    creditnote_data = _finish_partials([creditnote for _, creditnote in partials])
+
+    # Combine both datasets
+    return pd.concat([summarized_data, creditnote_data], ignore_index=True)
+
+
+def net_credit_notes(sales_data):
+    return combine_net_credit_notes([partial_net_credit_notes(sales_data)])
+
+
+def build_seller_index(sales_data):
+    # Sort the fact table by seller and time so every seller owns one
+    # contiguous block of rows, then record where each block starts and ends.
+    # Looking up a seller is then a slice instead of a scan of the whole table.
+    facts = (
+        sales_data
+        .assign(seller_name=lambda df: df['seller_name'].fillna('SIN VENDEDOR').str.upper())
+        .sort_values(['seller_name', 'issued_at'], kind='stable')
+        .reset_index(drop=True)
+    )
+
+    names = facts['seller_name'].to_numpy()
+    boundaries = np.flatnonzero(names[1:] != names[:-1]) + 1
+    starts = np.r_[0, boundaries] if len(names) else np.array([], dtype=int)
+    stops = np.r_[boundaries, len(names)] if len(names) else np.array([], dtype=int)
+
+    index = facts.groupby('seller_name', sort=True).agg(
+        total_sales=('item_sales', 'sum'),
+        due=('due', 'sum'),
+        invoices=('invoice_number', 'nunique'),
+        clients=('payee_nit', 'nunique'),
+        items=('item_name', 'nunique'),
+        first_sale=('issued_at', 'min'),
+        last_sale=('issued_at', 'max')
+    )
+    index['start'] = starts
+    index['stop'] = stops
+
+    return facts, index.sort_values('total_sales', ascending=False)
+
+
+def seller_rows(facts, index, seller_name):
+    start, stop = index.loc[seller_name, ['start', 'stop']]
+    return facts.iloc[int(start):int(stop)]
+
+
+def snapshot_path(snapshot_dir, day, report, period):
+    return os.path.join(snapshot_dir, pd.Timestamp(day).strftime('%Y-%m-%d'), report, period)
+
+
+def write_snapshot(snapshot_dir, day, report, period, result):
+    # One folder per report and period: kpis.json, a Parquet file per table
+    # and a JSON file per chart spec. The folder is written under a temporary
+    # name and swapped in, so readers never see a half-written snapshot. When
+    # an earlier one is replaced, the path is briefly missing between the two
+    # os.replace calls; load_snapshot then returns None and the page computes
+    # live data for that run.
+    path = snapshot_path(snapshot_dir, day, report, period)
+    staging = f'{path}.tmp-{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    for name, table in result['tables'].items():
+        table.to_parquet(os.path.join(staging, f'{name}.parquet'), index=False)
+
+    for name, spec in result['charts'].items():
+        with open(os.path.join(staging, f'{name}.json'), 'w') as file:
+            file.write(spec)
+
+    with open(os.path.join(staging, 'kpis.json'), 'w') as file:
+        json.dump(result['kpis'], file)
+
+    # os.replace cannot overwrite a non-empty directory, so a snapshot from an
+    # earlier run the same day is moved aside first
+    previous = f'{path}.old-{os.getpid()}'
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def load_snapshot(snapshot_dir, day, report, period):
+    # None when there is no usable snapshot, so callers fall back to live data
+    path = snapshot_path(snapshot_dir, day, report, period)
+    if not os.path.exists(os.path.join(path, 'kpis.json')):
+        return None
+
+    try:
+        with open(os.path.join(path, 'kpis.json'), 'r') as file:
+            kpis = json.load(file)
+
+        tables = {}
+        charts = {}
+        for filename in os.listdir(path):
+            name, extension = os.path.splitext(filename)
+            if extension == '.parquet':
+                tables[name] = pd.read_parquet(os.path.join(path, filename))
+            elif extension == '.json' and name != 'kpis':
+                with open(os.path.join(path, filename), 'r') as file:
+                    charts[name] = file.read()
+    except (OSError, ValueError):
+        return None
+
+    return {'kpis': kpis, 'tables': tables, 'charts': charts}
+
+
+def prune_snapshots(snapshot_dir, day, keep_days):
+    # Removes the day folders older than keep_days before day; returns their names
+    if not os.path.isdir(snapshot_dir):
+        return []
+
+    oldest = pd.Timestamp(day).normalize() - pd.Timedelta(days=keep_days)
+    removed = []
+    for name in sorted(os.listdir(snapshot_dir)):
+        try:
+            folder_day = pd.to_datetime(name, format='%Y-%m-%d')
+        except ValueError:
+            continue
+        if folder_day < oldest and os.path.isdir(os.path.join(snapshot_dir, name)):
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def load_todays_snapshot(snapshot_dir, report, period):
+    return load_snapshot(snapshot_dir, pd.Timestamp.today(), report, period)
@@ -0,0 +1,219 @@
+import codecs
+import hashlib
+import json
+import queue
+import re
+import threading
+from collections import namedtuple
+
+import pandas as pd
+import requests
+
+import data
+
+
+# Download, parse and transform run in their own threads connected by
+# bounded queues, so the socket keeps reading while earlier chunks are being
+# parsed and netted. Every stage hands its results downstream and finishes
+# with _DONE; a failing stage sends the exception instead.
+
+CHUNK_SIZE = 1 << 20
+BATCH_SIZE = 20000
+QUEUE_SIZE = 8
+
+DATE_COLUMNS = ['issued_at', 'creditnote_date']
+NUMERIC_COLUMNS = ['item_unitprice', 'item_quantity', 'item_sales', 'total', 'due']
+
+Sales = namedtuple('Sales', ['version', 'raw', 'netted'])
+
+_DONE = object()
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class _ArrayParser:
+    # Incremental parser for a top-level JSON array of objects
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._started = False
+        self.finished = False
+
+    def feed(self, text):
+        buffer = self._buffer + text
+        position = 0
+        records = []
+
+        if not self._started:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                self._buffer = ''
+                return records
+            if buffer[position] != '[':
+                raise ValueError('expected a JSON array from /sales/details')
+            self._started = True
+            position += 1
+
+        while not self.finished:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if buffer[position] == ']':
+                self.finished = True
+                break
+            try:
+                record, position = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The rest of the object has not arrived yet
+                break
+            records.append(record)
+
+        self._buffer = buffer[position:]
+        return records
+
+    def close(self):
+        if not self.finished:
+            raise ValueError('incomplete JSON array from /sales/details')
+
+
+def _put(out_queue, item, stop):
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+def _get(in_queue, stop):
+    while not stop.is_set():
+        try:
+            return in_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _download(url, params, out_queue, stop, digest):
+    try:
+        with requests.get(url = url, params = params, stream = True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if stop.is_set():
+                    return
+                digest.update(chunk)
+                _put(out_queue, chunk, stop)
+        _put(out_queue, _DONE, stop)
+    except Exception as error:
+        _put(out_queue, _Failure(error), stop)
+
+
+def _parse(in_queue, out_queue, stop, batch_size):
+    try:
+        parser = _ArrayParser()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        batch = []
+        while True:
+            chunk = _get(in_queue, stop)
+            if chunk is _DONE:
+                break
+            if isinstance(chunk, _Failure):
+                _put(out_queue, chunk, stop)
+                return
+            batch.extend(parser.feed(decoder.decode(chunk)))
+            while len(batch) >= batch_size:
+                _put(out_queue, pd.DataFrame.from_records(batch[:batch_size]), stop)
+                batch = batch[batch_size:]
+        batch.extend(parser.feed(decoder.decode(b'', final=True)))
+        parser.close()
+        if batch:
+            _put(out_queue, pd.DataFrame.from_records(batch), stop)
+        _put(out_queue, _DONE, stop)
+    except Exception as error:
+        _put(out_queue, _Failure(error), stop)
+
+
+def _transform(in_queue, out_queue, stop):
+    try:
+        while True:
+            batch = _get(in_queue, stop)
+            if batch is _DONE or isinstance(batch, _Failure):
+                _put(out_queue, batch, stop)
+                return
+            # Dtypes are inferred per batch, and an all-null column would be
+            # object; casting gives every batch the same dtypes before concat
+            for column in DATE_COLUMNS:
+                if column in batch:
+                    batch[column] = pd.to_datetime(batch[column])
+            for column in NUMERIC_COLUMNS:
+                if column in batch:
+                    batch[column] = pd.to_numeric(batch[column], errors='coerce')
+            _put(out_queue, (batch, data.partial_net_credit_notes(batch)), stop)
+    except Exception as error:
+        _put(out_queue, _Failure(error), stop)
+
+
+def empty_sales(version):
+    # Every empty result, from an empty response or an empty slice, has the
+    # dtypes of a netted response with rows, so .dt and numeric code still work
+    netted = pd.DataFrame({column: pd.Series(dtype=object) for column in data.GROUP_COLUMNS})
+    netted['issued_at'] = pd.Series(dtype='datetime64[ns]')
+    for column in ['total', 'due', 'item_sales']:
+        netted[column] = pd.Series(dtype='float64')
+    return Sales(version, pd.DataFrame(), netted)
+
+
+def load_sales(url, params=None, batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE):
+    # Returns the raw rows, the credit-note netted rows and a content hash
+    # of the response that can be used as the data version
+    stop = threading.Event()
+    digest = hashlib.sha256()
+    chunks = queue.Queue(maxsize=queue_size)
+    batches = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
+
+    stages = [
+        threading.Thread(target=_download, args=(url, params, chunks, stop, digest), daemon=True),
+        threading.Thread(target=_parse, args=(chunks, batches, stop, batch_size), daemon=True),
+        threading.Thread(target=_transform, args=(batches, results, stop), daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+
+    raw_batches = []
+    partials = []
+    try:
+        while True:
+            result = results.get()
+            if result is _DONE:
+                break
+            if isinstance(result, _Failure):
+                raise result.error
+            raw, partial = result
+            raw_batches.append(raw)
+            partials.append(partial)
+    finally:
+        stop.set()
+        for stage in stages:
+            stage.join()
+
+    if not raw_batches:
+        return empty_sales(digest.hexdigest())
+
+    raw = pd.concat(raw_batches, ignore_index=True)
+    return Sales(digest.hexdigest(), raw, data.combine_net_credit_notes(partials))
+
+
+def load_sellers(url, params=None):
+    # Distinct seller names, without downloading their sales. The endpoint is
+    # optional (mock_api.py has it); None when the backend does not serve it.
+    response = requests.get(url = url, params = params)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,370 @@
+from collections import namedtuple
+
+import pandas as pd
+import numpy as np
+
+
+# payee_nit used for medical samples
+SAMPLES_NIT = '105272981'
+
+
+def standard_periods(today):
+    # Date ranges precomputed by batch.py, keyed by the name used on disk
+    today = pd.Timestamp(today).normalize()
+    start_of_month = today.replace(day=1)
+    return {
+        'ytd': (pd.Timestamp(today.year, 1, 1).date(), today.date()),
+        'last_month': ((start_of_month - pd.DateOffset(months=1)).date(), (start_of_month - pd.Timedelta(days=1)).date()),
+        'last_30_days': ((today - pd.Timedelta(days=30)).date(), today.date()),
+    }
+
+
+def match_period(date_range, today):
+    for period, period_range in standard_periods(today).items():
+        if tuple(date_range) == period_range:
+            return period
+    return None
+
+
+def filter_period(sales_data, start, end):
+    return sales_data[
+        (sales_data['issued_at'] >= pd.Timestamp(start)) &
+        (sales_data['issued_at'] <= pd.Timestamp(end))
+    ]
+
+
+### VISTA GENERAL
+
+def overview_kpis(filtered_sales_data):
+    # Monthly growth trend in terms of average percentage growth
+    monthly_growth = (
+        filtered_sales_data
+        .groupby(filtered_sales_data['issued_at'].dt.to_period('M'))
+        .agg({'item_sales': 'sum'})
+        .pct_change() * 100
+    )
+    return {
+        'overall_total': float(filtered_sales_data['item_sales'].sum()),
+        'overall_total_muestras': float(filtered_sales_data[filtered_sales_data['payee_nit'] != SAMPLES_NIT]['item_sales'].sum()),
+        'due_amount': float(filtered_sales_data['due'].sum()),
+        'average_growth': float(monthly_growth['item_sales'].mean()),
+    }
+
+
+def monthly_sales(filtered_sales_data):
+    monthly_sales = (
+        filtered_sales_data
+        .groupby(filtered_sales_data['issued_at'].dt.to_period('M'))
+        .agg({'item_sales': 'sum'})
+        .reset_index()
+        .rename(columns={'issued_at': 'month', 'item_sales': 'monthly_total'})
+    )
+    monthly_sales['month'] = monthly_sales['month'].dt.to_timestamp()
+
+    # Ensure no empty dates by creating a complete date range
+    all_months = pd.date_range(
+        start=monthly_sales['month'].min(),
+        end=monthly_sales['month'].max(),
+        freq='MS'
+    )
+    monthly_sales = monthly_sales.set_index('month').reindex(all_months).fillna(0).reset_index()
+    monthly_sales = monthly_sales.rename(columns={'index': 'month'})
+    monthly_sales['month_text'] = monthly_sales['month'].dt.strftime('%Y-%m')
+
+    # Calculate Month-over-Month (MoM) growth
+    monthly_sales['mom_growth'] = monthly_sales['monthly_total'].pct_change() * 100
+    monthly_sales['mom_growth'] = monthly_sales['mom_growth'].fillna(0)
+    return monthly_sales
+
+
+def monthly_sales_chart(monthly_sales):
+    import altair as alt  # Plotting libraries are imported on first use
+
+    return alt.Chart(monthly_sales).mark_bar().encode(
+        x=alt.X('month_text:N', title='Month'),  # Display dates as strings in format YYYY MMM
+        y=alt.Y('monthly_total:Q', title='Monthly Sales'),
+        tooltip=[
+            alt.Tooltip('month_text:N', title='Mes'),
+            alt.Tooltip('monthly_total:Q', title='Venta mensual', format=',.2f'),
+            alt.Tooltip('mom_growth:Q', title='MoM (%)', format='.2f')
+        ]
+    ).properties(
+        title="Ventas mensuales",
+        width=800,
+        height=400
+    )
+
+
+def seller_ranking(filtered_sales_data):
+    seller_ranking = (
+        filtered_sales_data
+        .assign(seller_name=lambda df: df['seller_name'].str.upper())  # Transform seller_name to upper case
+        .groupby('seller_name', as_index=False)
+        .agg({'item_sales': 'sum'})
+        .sort_values('item_sales', ascending=False)
+    )
+    seller_ranking['percentage'] = ((seller_ranking['item_sales'] / seller_ranking['item_sales'].sum()) * 100).round(1).astype(str) + '%'
+    return seller_ranking
+
+
+def top_items(filtered_sales_data):
+    top_items = (
+        filtered_sales_data
+        .groupby('item_name', as_index=False)
+        .agg({'item_sales': 'sum'})
+        .sort_values('item_sales', ascending=False)
+    )
+    top_items['percentage'] = ((top_items['item_sales'] / top_items['item_sales'].sum()) * 100).round(1).astype(str) + '%'
+    return top_items
+
+
+def receivables(sales_data):
+    highest_due = (
+        sales_data[sales_data['item_sales']>0]
+        .sort_values(['due', 'issued_at'], ascending=[False, True])
+        .query('due > 0')
+        .loc[:, ['issued_at', 'invoice_number', 'seller_name', 'payee_name', 'due']]
+    )
+    highest_due['days_since_issue'] = (pd.Timestamp.today() - highest_due['issued_at']).dt.days
+    highest_due['issued_at'] = highest_due['issued_at'].dt.strftime('%Y-%m-%d')
+
+    return highest_due.groupby(['issued_at', 'days_since_issue', 'invoice_number', 'seller_name', 'payee_name'])['due'].mean().reset_index()
+
+
+### CLIENTES
+
+CLIENT_COLORS = {
+    'Nuevo': 'limegreen',
+    'Leal': 'green',
+    'Curioso': 'dodgerblue',
+    'Latente': 'blue',
+    '1 Timer': 'orangered',
+    'Olvidado': 'red',
+    'unknown': 'gray'
+}
+
+
+def client_segments(sales_data):
+    summary = sales_data.groupby(['payee_nit', 'payee_name']).agg(
+        total_sales=('item_sales', 'sum'),
+        distinct_days_with_sales=('issued_at', 'nunique'),
+        days_since_last_purchase=('issued_at', lambda x: (pd.Timestamp.now() - pd.to_datetime(x).max()).days)
+    ).reset_index()
+
+    six_months_ago = 180  # Approximate days in 6 months
+    one_year_ago = 365  # Approximate days in 1 year
+    avg_distinct_days = summary['distinct_days_with_sales'].mean()
+
+    conditions = [
+        (summary['days_since_last_purchase'] <= six_months_ago) & (summary['distinct_days_with_sales'] < avg_distinct_days),
+        (summary['days_since_last_purchase'] <= six_months_ago) & (summary['distinct_days_with_sales'] >= avg_distinct_days),
+        (summary['days_since_last_purchase'] <= one_year_ago) & (summary['distinct_days_with_sales'] < avg_distinct_days),
+        (summary['days_since_last_purchase'] <= one_year_ago) & (summary['distinct_days_with_sales'] >= avg_distinct_days),
+        (summary['days_since_last_purchase'] > one_year_ago) & (summary['distinct_days_with_sales'] < avg_distinct_days),
+        (summary['days_since_last_purchase'] > one_year_ago) & (summary['distinct_days_with_sales'] >= avg_distinct_days)
+    ]
+
+    choices = ['Nuevo', 'Leal', 'Curioso', 'Latente', '1 Timer', 'Olvidado']
+
+    summary['category'] = np.select(conditions, choices, default='unknown')
+    return summary
+
+
+def client_segments_chart(summary):
+    import plotly.express as px
+
+    avg_distinct_days = summary['distinct_days_with_sales'].mean()
+
+    fig = px.scatter(
+        summary,
+        x='days_since_last_purchase',
+        y='distinct_days_with_sales',
+        size='total_sales',
+        color='category',
+        color_discrete_map=CLIENT_COLORS,
+        title='Segmentación de clientes',
+        labels={
+            'days_since_last_purchase': 'Días desde última compra',
+            'distinct_days_with_sales': 'Ventas distintas',
+            'total_sales': 'Ventas Totales',
+            'category': 'Categoría'
+        },
+        hover_data={
+            'payee_name': True,
+            'payee_nit': True,
+            'days_since_last_purchase': True,
+            'distinct_days_with_sales': True,
+            'category': True,
+        },
+        height=800  # Increase the plot height
+    )
+
+    # Increase font size for the plot
+    fig.update_layout(
+        font=dict(size=16)  # Set font size to 16
+    )
+
+    # Add vertical and horizontal dashed lines for cuts
+    fig.add_vline(x=180, line_dash="dash", line_color="gray", annotation_text="6 meses", annotation_position="top left")
+    fig.add_vline(x=365, line_dash="dash", line_color="gray", annotation_text="1 año", annotation_position="top left")
+    fig.add_hline(y=avg_distinct_days, line_dash="dash", line_color="gray", annotation_text="Avg Compras", annotation_position="top right")
+    return fig
+
+
+def category_sales(summary):
+    category_sales = summary.groupby('category').agg(
+        total_sales=('total_sales', 'sum'),
+        client_count=('payee_nit', 'count')
+    ).reset_index()
+
+    # Sort by total sales in descending order
+    return category_sales.sort_values(by='total_sales', ascending=False).reset_index(drop=True)
+
+
+### PRODUCTOS
+
+def product_sales(sales_data):
+    # Remove sales to payee_nit 105272981
+    sales_data = sales_data[sales_data['payee_nit'] != 105272981]
+    return sales_data.assign(issued_at=pd.to_datetime(sales_data['issued_at']))
+
+
+def filter_products(sales_data, selected_categories, selected_items, min_price, max_price):
+    filtered_data = sales_data
+    if selected_categories:
+        filtered_data = filtered_data[filtered_data['item_category'].isin(selected_categories)]
+    if selected_items:
+        filtered_data = filtered_data[filtered_data['item_name'].isin(selected_items)]
+    filtered_data = filtered_data[
+        (filtered_data['item_unitprice'] >= min_price) & (filtered_data['item_unitprice'] <= max_price)
+    ]
+    return filtered_data.assign(item_quantity=filtered_data['item_quantity'].astype(float))
+
+
+CategoryMatrix = namedtuple('CategoryMatrix', ['categories', 'months', 'monthly_sales', 'cumulative_sales'])
+
+
+def category_month_matrix(sales_data):
+    # Dense category x month matrices of monthly and cumulative sales. Rows
+    # are category codes and columns month ordinals (year * 12 + month), so
+    # their size depends on categories x months, not on the number of sales.
+    category_codes, categories = pd.factorize(sales_data['item_category'], sort=True)
+    month_ordinals = (sales_data['issued_at'].dt.year * 12 + sales_data['issued_at'].dt.month - 1).to_numpy()
+    month_codes, months = pd.factorize(month_ordinals, sort=True)
+
+    valid = (category_codes >= 0) & (month_codes >= 0)
+    item_sales = np.nan_to_num(sales_data['item_sales'].to_numpy(dtype=float))
+
+    monthly_sales = np.bincount(
+        category_codes[valid] * len(months) + month_codes[valid],
+        weights=item_sales[valid],
+        minlength=len(categories) * len(months)
+    ).reshape(len(categories), len(months))
+
+    months = [f'{int(month) // 12:04d}-{int(month) % 12 + 1:02d}' for month in months]
+    return CategoryMatrix(categories, months, monthly_sales, monthly_sales.cumsum(axis=1))
+
+
+def cumulative_category_sales(category_matrix):
+    # Long form for plotting, one row per category and month
+    categories, months, monthly_sales, cumulative_sales = category_matrix
+    return pd.DataFrame({
+        'item_category': np.repeat(categories.to_numpy(), len(months)),
+        'month': np.tile(months, len(categories)),
+        'item_sales': monthly_sales.ravel(),
+        'cumulative_sales': cumulative_sales.ravel()
+    })
+
+
+def cumulative_category_chart(sales_data_grouped):
+    import plotly.express as px
+
+    # Create the line plot with dots on observations
+    fig = px.line(
+        sales_data_grouped,
+        x='month',
+        y='cumulative_sales',
+        color='item_category',
+        title='Ventas acumuladas por categoría de producto por mes',
+        labels={
+            'cumulative_sales': 'Ventas acumuladas',
+            'month': 'Mes',
+            'item_category': 'Categoría de producto',
+            'item_sales': 'Ventas mensuales'
+        },
+        hover_data={'item_sales': True}  # Add month-specific sales to the tooltip
+    )
+    fig.update_traces(mode='lines+markers')  # Add dots on observations
+
+    # Adjust the height of the plot
+    fig.update_layout(height=800)  # Set the height to 800 pixels
+    return fig
+
+
+def product_kpis(filtered_data):
+    return {
+        'distinct_items': int(filtered_data['item_name'].nunique()),
+        'avg_unitprice': float(filtered_data['item_unitprice'].astype('float').mean()),
+        'avg_units_per_invoice': float(filtered_data.groupby('invoice_number')['item_quantity'].mean().mean()),
+        'min_unitprice': float(filtered_data['item_unitprice'].min()),
+        'max_unitprice': float(filtered_data['item_unitprice'].max()),
+    }
+
+
+def price_quantity_counts(filtered_data):
+    # Group by item_quantity and item_unitprice, and count the number of sales
+    return filtered_data.groupby(['item_quantity', 'item_unitprice']).size().reset_index(name='sales_count')
+
+
+def item_summary(filtered_data):
+    # Group by item and calculate total sales, most frequent payee, and last sale date
+    item_summary = filtered_data.groupby('item_name').agg(
+        total_sales=('item_sales', 'sum'),
+        top_payee=('payee_name', lambda x: x.value_counts().idxmax())
+    ).reset_index()
+
+    # Round total sales to 2 decimal places
+    item_summary['total_sales'] = item_summary['total_sales'].round(2)
+
+    # Add the last sale date for the top payee
+    item_summary['last_sale_to_top_payee'] = item_summary.apply(
+        lambda row: filtered_data[
+        (filtered_data['item_name'] == row['item_name']) &
+        (filtered_data['payee_name'] == row['top_payee'])
+        ]['issued_at'].max(),
+        axis=1
+    )
+    return item_summary
+
+
+### EQUIPO DE VENTAS
+
+def seller_ytd(filtered_data, selected_sellers, current_date):
+    start_of_year = pd.Timestamp(year=current_date.year, month=1, day=1)
+
+    # Filter data for the current year up to today
+    current_year_data = filtered_data[
+        (filtered_data['issued_at'] >= start_of_year) &
+        (filtered_data['issued_at'] <= current_date)
+    ]
+
+    # Filter data for the same period last year
+    previous_year_start = start_of_year - pd.DateOffset(years=1)
+    previous_year_end = current_date - pd.DateOffset(years=1)
+    previous_year_data = filtered_data[
+        (filtered_data['issued_at'] >= previous_year_start) &
+        (filtered_data['issued_at'] <= previous_year_end)
+    ]
+
+    # Calculate YTD sales and YoY growth
+    ytd_sales = current_year_data.groupby('seller_name')['item_sales'].sum().reindex(selected_sellers, fill_value=0)
+    previous_ytd_sales = previous_year_data.groupby('seller_name')['item_sales'].sum().reindex(selected_sellers, fill_value=0)
+
+    yoy_growth = ((ytd_sales - previous_ytd_sales) / previous_ytd_sales.replace(0, np.nan)) * 100
+    yoy_growth = yoy_growth.fillna(0)  # Handle division by zero or NaN cases
+
+    return pd.DataFrame({
+        'Seller Name': ytd_sales.index,
+        'YTD Sales': ytd_sales.values,
+        'YoY Growth': yoy_growth.values
+    }).sort_values('Seller Name').reset_index()
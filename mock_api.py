@@ -0,0 +1,82 @@
+import argparse
+import json
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# Local stand-in for the backend's /sales/details endpoint, for developing
+# and checking the slice pushdown in slices.py without the real API. It also
+# serves /sales/sellers, the distinct upper-cased seller names of the rows
+# matching the same parameters:
+#
+#     python mock_api.py sales.json --port 8000
+#     BASE_URL=http://localhost:8000 streamlit run ibiomed.py
+#
+# sales.json is a saved /sales/details response. Query parameters follow the
+# slice rules documented in slices.py. Every request is logged with the
+# number of rows returned, so it shows what each page actually downloads.
+
+
+def _day(value):
+    return date.fromisoformat(value[:10]) if value else None
+
+
+def matches(record, params):
+    start = _day(params.get('start_date', [None])[0])
+    end = _day(params.get('end_date', [None])[0])
+    if start or end:
+        days = [_day(record.get('issued_at')), _day(record.get('creditnote_date'))]
+        if not any(day and (not start or day >= start) and (not end or day <= end) for day in days):
+            return False
+    if 'seller_name' in params and (record.get('seller_name') or '').upper() not in params['seller_name']:
+        return False
+    if 'item_category' in params and record.get('item_category') not in params['item_category']:
+        return False
+    if params.get('due_only') == ['true'] and not (record.get('due') or 0) > 0:
+        return False
+    return True
+
+
+def make_handler(records):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path not in ('/sales/details', '/sales/sellers'):
+                self.send_error(404)
+                return
+
+            params = parse_qs(url.query)
+            if 'seller_name' in params:
+                params['seller_name'] = [seller.upper() for seller in params['seller_name']]
+            rows = [record for record in records if matches(record, params)]
+            if url.path == '/sales/sellers':
+                rows = sorted({(record.get('seller_name') or '').upper() for record in rows})
+            body = json.dumps(rows).encode()
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self.log_message('%s -> %d rows, %d bytes', self.path, len(rows), len(body))
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a saved /sales/details response with slice filtering')
+    parser.add_argument('path', help='JSON file with a list of sales rows')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    with open(args.path, 'r') as file:
+        records = json.load(file)
+
+    server = ThreadingHTTPServer(('localhost', args.port), make_handler(records))
+    print(f'Serving {len(records)} rows on http://localhost:{args.port}/sales/details')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,23 @@
 import streamlit  as st
 import hashlib 
-import json 
-import requests
-import pandas as pd
 import os 
-import numpy as np
-import plotly.express as px
+import data
+import ingest
+import metrics
+import settings
+from tables import paged_table
 
 st.set_page_config(layout="wide")
 
-with open('config.json', 'r') as file: 
-    config = json.load(file) 
+config = settings.load_config()
 
 if not 'authenticated' in st.session_state: 
     st.session_state.authenticated = False
 
-@st.cache_data
-def fetch_data(url): 
-    return requests.get(url = url).json() 
+@st.cache_resource(ttl=config['cache']['ttl'], max_entries=config['cache']['max_entries'])
+def load_sales(url): 
+    # Shared between sessions, so the frames must not be modified in place
+    return ingest.load_sales(url)
 
 
 if not st.session_state.authenticated: 
@@ -29,84 +29,19 @@ if not st.session_state.authenticated:
 if st.session_state.authenticated:
 
     st.title('Clientes')
-    sales_data = pd.DataFrame(fetch_data(os.getenv("BASE_URL") + "/sales/details"))
-
-    summary = sales_data.groupby(['payee_nit', 'payee_name']).agg(
-        total_sales=('item_sales', 'sum'),
-        distinct_days_with_sales=('issued_at', 'nunique'),
-        days_since_last_purchase=('issued_at', lambda x: (pd.Timestamp.now() - pd.to_datetime(x).max()).days)
-    ).reset_index()
-
-    six_months_ago = 180  # Approximate days in 6 months
-    one_year_ago = 365  # Approximate days in 1 year
-    avg_distinct_days = summary['distinct_days_with_sales'].mean()
-
-    conditions = [
-        (summary['days_since_last_purchase'] <= six_months_ago) & (summary['distinct_days_with_sales'] < avg_distinct_days),
-        (summary['days_since_last_purchase'] <= six_months_ago) & (summary['distinct_days_with_sales'] >= avg_distinct_days),
-        (summary['days_since_last_purchase'] <= one_year_ago) & (summary['distinct_days_with_sales'] < avg_distinct_days),
-        (summary['days_since_last_purchase'] <= one_year_ago) & (summary['distinct_days_with_sales'] >= avg_distinct_days),
-        (summary['days_since_last_purchase'] > one_year_ago) & (summary['distinct_days_with_sales'] < avg_distinct_days),
-        (summary['days_since_last_purchase'] > one_year_ago) & (summary['distinct_days_with_sales'] >= avg_distinct_days)
-    ]
-
-    choices = ['Nuevo', 'Leal', 'Curioso', 'Latente', '1 Timer', 'Olvidado']
-
-    summary['category'] = np.select(conditions, choices, default='unknown')
-    color_map = {
-        'Nuevo': 'limegreen',
-        'Leal': 'green',
-        'Curioso': 'dodgerblue',
-        'Latente': 'blue',
-        '1 Timer': 'orangered',
-        'Olvidado': 'red',
-        'unknown': 'gray'
-    }
-
-    fig = px.scatter(
-        summary,
-        x='days_since_last_purchase',
-        y='distinct_days_with_sales',
-        size='total_sales',
-        color='category',
-        color_discrete_map=color_map,
-        title='Segmentación de clientes',
-        labels={
-            'days_since_last_purchase': 'Días desde última compra',
-            'distinct_days_with_sales': 'Ventas distintas',
-            'total_sales': 'Ventas Totales',
-            'category': 'Categoría'
-        },
-        hover_data={
-            'payee_name': True,
-            'payee_nit': True,
-            'days_since_last_purchase': True,
-            'distinct_days_with_sales': True,
-            'category': True,
-        },
-        height=800  # Increase the plot height
-    )
-
-    # Increase font size for the plot
-    fig.update_layout(
-        font=dict(size=16)  # Set font size to 16
-    )
-
-    # Add vertical and horizontal dashed lines for cuts
-    fig.add_vline(x=180, line_dash="dash", line_color="gray", annotation_text="6 meses", annotation_position="top left")
-    fig.add_vline(x=365, line_dash="dash", line_color="gray", annotation_text="1 año", annotation_position="top left")
-    fig.add_hline(y=avg_distinct_days, line_dash="dash", line_color="gray", annotation_text="Avg Compras", annotation_position="top right")
 
+    # The nightly batch run has the segments already; live data is the fallback
+    snapshot = data.load_todays_snapshot(config.get('snapshot_dir', 'snapshots'), 'clientes', 'all')
+    if snapshot:
+        summary = snapshot['tables']['summary']
+        category_sales = snapshot['tables']['category_sales']
+    else:
+        summary = metrics.client_segments(load_sales(os.getenv("BASE_URL") + "/sales/details").raw)
+        category_sales = metrics.category_sales(summary)
+    fig = metrics.client_segments_chart(summary)
 
     # Display overall sales by category in cards, ordered by total sales
     st.subheader("Ventas por Categoría")
-    category_sales = summary.groupby('category').agg(
-        total_sales=('total_sales', 'sum'),
-        client_count=('payee_nit', 'count')
-    ).reset_index()
-
-    # Sort by total sales in descending order
-    category_sales = category_sales.sort_values(by='total_sales', ascending=False).reset_index(drop=True)
 
     cols = st.columns(len(category_sales))
     for i, row in category_sales.iterrows():
@@ -160,4 +95,4 @@ if st.session_state.authenticated:
     # Format 'Ventas Totales' column as Q{,.2f}
     detailed_table['Ventas Totales'] = detailed_table['Ventas Totales'].round(2)
 
-    st.dataframe(detailed_table.style.format({"Ventas Totales": "Q{:,.2f}"}), use_container_width=True, hide_index=True)
\ No newline at end of file
+    paged_table(detailed_table, key='clientes_detalle', formats={"Ventas Totales": "Q{:,.2f}"})
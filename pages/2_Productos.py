@@ -1,25 +1,27 @@
 import streamlit as st 
-import json 
-import requests 
 import hashlib 
-import pandas as pd 
 import os 
 import numpy as np 
-import plotly.express as px
+import data
+import ingest
+import metrics
+import settings
+import slices
+from cache import normalize_key, shared_cache
+from tables import paged_table
 
 st.set_page_config(layout="wide")
 
 
-with open('config.json', 'r') as file: 
-    config = json.load(file) 
+config = settings.load_config()
 
 if not 'authenticated' in st.session_state: 
     st.session_state.authenticated = True
 
-@st.cache_data
-def fetch_data(url): 
-    return requests.get(url = url).json() 
-
+@st.cache_resource(ttl=config['cache']['ttl'], max_entries=config['cache']['max_entries'])
+def load_sales(url): 
+    # Shared between sessions, so the frames must not be modified in place
+    return ingest.load_sales(url)
 
 if not st.session_state.authenticated: 
     
@@ -31,51 +33,43 @@ if st.session_state.authenticated:
 
     st.title('Productos')
     st.caption('De este análisis se excluyen muestras médicas')
-    sales_data = pd.DataFrame(fetch_data(os.getenv("BASE_URL") + "/sales/details"))
-
-    # Remove sales to payee_nit 105272981
-    sales_data = sales_data[sales_data['payee_nit'] != 105272981]
-
-    # Convert issued_date to datetime and extract quarter
-    sales_data['issued_at'] = pd.to_datetime(sales_data['issued_at'])
-    sales_data['month'] = sales_data['issued_at'].dt.to_period('M').astype(str)
-
-    # Create a complete index of item_category and month combinations
-    all_combinations = pd.MultiIndex.from_product(
-        [sales_data['item_category'].unique(), sales_data['month'].unique()],
-        names=['item_category', 'month']
-    )
 
-    # Group by item_category and month, then calculate item_sales
-    sales_data_grouped = sales_data.groupby(['item_category', 'month'])['item_sales'].sum()
+    # Derived tables are shared across reruns, keyed by filter state and data version
+    results = shared_cache(config['cache']['max_bytes'])
+
+    def load_product_sales(categories=None):
+        # A category filter is sent to the backend instead of loading every sale
+        if categories:
+            sales = slices.load(slices.make_slice(categories=categories))
+        else:
+            sales = load_sales(os.getenv("BASE_URL") + "/sales/details")
+        return sales.version, results.get_or_compute(
+            normalize_key('productos', sales.version),
+            lambda: metrics.product_sales(sales.raw)
+        )
 
-    # Reindex to fill missing combinations with 0
-    sales_data_grouped = sales_data_grouped.reindex(all_combinations, fill_value=0)
+    # The nightly batch run has the chart, the filter options and the unfiltered
+    # view; the sales rows are only loaded when the filters need them
+    snapshot = data.load_todays_snapshot(config.get('snapshot_dir', 'snapshots'), 'productos', 'all')
+    if snapshot:
+        cumulative_sales = snapshot['tables']['cumulative_sales']
+        category_options = list(cumulative_sales['item_category'].unique())
+        item_options = list(snapshot['tables']['item_summary']['item_name'])
+        price_range = (snapshot['kpis']['min_unitprice'], snapshot['kpis']['max_unitprice'])
+    else:
+        data_version, sales_data = load_product_sales()
+        category_matrix = results.get_or_compute(
+            normalize_key('productos_categorias', data_version),
+            lambda: metrics.category_month_matrix(sales_data)
+        )
+        cumulative_sales = metrics.cumulative_category_sales(category_matrix)
+        category_options = list(sales_data['item_category'].unique())
+        item_options = list(sales_data['item_name'].unique())
+        price_range = (float(sales_data['item_unitprice'].min()), float(sales_data['item_unitprice'].max()))
 
-    # Sort values by month
-    sales_data_grouped = sales_data_grouped.reset_index().sort_values(by=['item_category', 'month'])
-    
-    sales_data_grouped['cumulative_sales'] = sales_data_grouped.groupby('item_category')['item_sales'].cumsum()
-
-    # Create the line plot with dots on observations
-    fig = px.line(
-        sales_data_grouped,
-        x='month',
-        y='cumulative_sales',
-        color='item_category',
-        title='Ventas acumuladas por categoría de producto por mes',
-        labels={
-            'cumulative_sales': 'Ventas acumuladas',
-            'month': 'Mes',
-            'item_category': 'Categoría de producto',
-            'item_sales': 'Ventas mensuales'
-        },
-        hover_data={'item_sales': True}  # Add month-specific sales to the tooltip
-    )
-    fig.update_traces(mode='lines+markers')  # Add dots on observations
+    import plotly.express as px  # First needed by the chart below, so the password prompt never loads it
 
-    # Adjust the height of the plot
-    fig.update_layout(height=800)  # Set the height to 800 pixels
+    fig = metrics.cumulative_category_chart(cumulative_sales)
 
     # Display the plot
     st.plotly_chart(fig, use_container_width=True)
@@ -87,56 +81,66 @@ if st.session_state.authenticated:
     with filter_column1:
         selected_categories = st.multiselect(
             "Selecciona categorías de producto",
-            options=list(sales_data['item_category'].unique()),
+            options=category_options,
             default=[]
         )
 
     with filter_column2:
         selected_items = st.multiselect(
             "Selecciona nombres de productos",
-            options=list(sales_data['item_name'].unique()),
+            options=item_options,
             default=[]
         )
 
     with filter_column3:
         min_price, max_price = st.slider(
             "Selecciona rango de precios",
-            min_value=float(sales_data['item_unitprice'].min()),
-            max_value=float(sales_data['item_unitprice'].max()),
-            value=(float(sales_data['item_unitprice'].min()), float(sales_data['item_unitprice'].max())),
+            min_value=price_range[0],
+            max_value=price_range[1],
+            value=price_range,
             step=250.0
         )
 
-    # Apply filters to the sales_data DataFrame
-    filtered_data = sales_data.copy()
-    if selected_categories:
-        filtered_data = filtered_data[filtered_data['item_category'].isin(selected_categories)]
-    if selected_items:
-        filtered_data = filtered_data[filtered_data['item_name'].isin(selected_items)]
-    filtered_data = filtered_data[
-        (filtered_data['item_unitprice'] >= min_price) & (filtered_data['item_unitprice'] <= max_price)
-    ]
-    
+    if snapshot and not selected_categories and not selected_items and (min_price, max_price) == price_range:
+        kpis = snapshot['kpis']
+        item_summary = snapshot['tables']['item_summary']
+        scatter_data = snapshot['tables']['scatter_data']
+    else:
+        if snapshot:
+            data_version, sales_data = load_product_sales(selected_categories)
+
+        # Apply filters to the sales_data DataFrame
+        filter_key = normalize_key(data_version, selected_categories, selected_items, min_price, max_price)
+        filtered_data = results.get_or_compute(
+            ('productos_filtrados',) + filter_key,
+            lambda: metrics.filter_products(sales_data, selected_categories, selected_items, min_price, max_price)
+        )
+        kpis = metrics.product_kpis(filtered_data)
+        item_summary = results.get_or_compute(
+            ('productos_resumen',) + filter_key,
+            lambda: metrics.item_summary(filtered_data)
+        )
+        scatter_data = metrics.price_quantity_counts(filtered_data)
+
     # Create cards to display key metrics
     card_column1, card_column2, card_column3 = st.columns(3)
 
     with card_column1:
         st.metric(
             label="Número de productos distintos",
-            value=filtered_data['item_name'].nunique()
+            value=kpis['distinct_items']
         )
 
     with card_column2:
         st.metric(
             label="Precio unitario promedio",
-            value=f"Q{filtered_data['item_unitprice'].astype('float').mean():,.2f}"
+            value=f"Q{kpis['avg_unitprice']:,.2f}"
         )
 
     with card_column3:
-        filtered_data['item_quantity'] = filtered_data['item_quantity'].astype(float)
         st.metric(
             label="Promedio de unidades vendidas por factura",
-            value=f"{filtered_data.groupby('invoice_number')['item_quantity'].mean().mean():,.2f}"
+            value=f"{kpis['avg_units_per_invoice']:,.2f}"
         )
 
     # Create two columns
@@ -144,41 +148,20 @@ if st.session_state.authenticated:
 
     # Left column: Display the item summary table
     with left_column:
-        # Group by item and calculate total sales, most frequent payee, and last sale date
-        item_summary = filtered_data.groupby('item_name').agg(
-            total_sales=('item_sales', 'sum'),
-            top_payee=('payee_name', lambda x: x.value_counts().idxmax())
-        ).reset_index()
-
-        # Round total sales to 2 decimal places
-        item_summary['total_sales'] = item_summary['total_sales'].round(2)
-
-        # Add the last sale date for the top payee
-        item_summary['last_sale_to_top_payee'] = item_summary.apply(
-            lambda row: filtered_data[
-            (filtered_data['item_name'] == row['item_name']) & 
-            (filtered_data['payee_name'] == row['top_payee'])
-            ]['issued_at'].max(),
-            axis=1
-        )
-
         # Rename columns for better readability
-        item_summary.rename(columns={
+        item_summary = item_summary.rename(columns={
             'item_name': 'Nombre del producto',
             'total_sales': 'Ventas totales',
             'top_payee': 'Mayor Comprador',
             'last_sale_to_top_payee': 'Última venta al mayor comprador'
-        }, inplace=True)
+        })
 
         # Display the table in Streamlit
         st.subheader('Resumen histórico de ventas por producto')
-        st.dataframe(item_summary.style.format({"Ventas totales": "Q{:,.2f}"}), hide_index=True, height=800)  # Set the height to 800 pixels
+        paged_table(item_summary, key='productos_resumen', formats={"Ventas totales": "Q{:,.2f}"}, height=800)  # Set the height to 800 pixels
 
     # Right column: Display the scatter plot
     with right_column:
-        # Group by item_quantity and item_unitprice, and count the number of sales
-        scatter_data = filtered_data.groupby(['item_quantity', 'item_unitprice']).size().reset_index(name='sales_count')
-
         # Fit an exponential function to the data
         exp_fit = np.polyfit(scatter_data['item_unitprice'], np.log(scatter_data['item_quantity']), 1)
         exp_func = lambda x: np.exp(exp_fit[0] * x + exp_fit[1])
@@ -229,3 +212,9 @@ if st.session_state.authenticated:
 
         # Display the scatter plot
         st.plotly_chart(scatter_fig, use_container_width=True)
+
+    cache_stats = results.stats()
+    st.sidebar.caption(
+        f"Caché: {cache_stats['hits']} aciertos · {cache_stats['misses']} fallos · "
+        f"{cache_stats['bytes'] / 2**20:,.1f} de {cache_stats['max_bytes'] / 2**20:,.0f} MB"
+    )
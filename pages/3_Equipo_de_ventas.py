@@ -1,24 +1,24 @@
 import streamlit as st 
-import json 
-import requests 
 import hashlib 
 import pandas as pd 
-import os 
 import numpy as np 
-import plotly.express as px
+import data
+import metrics
+import settings
+import slices
+from cache import normalize_key, shared_cache
 
 st.set_page_config(layout="wide")
 
 
-with open('config.json', 'r') as file: 
-    config = json.load(file) 
+config = settings.load_config()
 
 if not 'authenticated' in st.session_state: 
     st.session_state.authenticated = False
 
-@st.cache_data
-def fetch_data(url): 
-    return requests.get(url = url).json() 
+@st.cache_data(ttl=config['cache']['ttl'])
+def load_seller_names(start, end): 
+    return slices.seller_names(start, end)
 
 
 if not st.session_state.authenticated: 
@@ -30,73 +30,38 @@ if not st.session_state.authenticated:
 if st.session_state.authenticated:
 
     st.title('Equipo de ventas')
-    sales_data = pd.DataFrame(fetch_data(os.getenv("BASE_URL") + "/sales/details"))
-
-    # Summarize where creditnote_date is null
-    summarized_data = (
-        sales_data
-        .groupby(['issued_at', 'invoice_number', 'seller_name', 'payee_name', 'payee_nit', 'item_name'], as_index=False)
-        .agg({'total': 'mean', 'due': 'mean', 'item_sales' : 'sum'})
-    )
-
-    # Process where creditnote_date is not null
-    creditnote_data = (
-        sales_data[sales_data['creditnote_date'].notnull()]
-        .assign(
-            issued_at=lambda df: df['creditnote_date'],
-            total=lambda df: df['total'] * -1,
-            item_sales = lambda df: df['item_sales'] * -1 ,
-            due = 0
-        )
-        .groupby(['issued_at', 'invoice_number', 'seller_name', 'payee_name', 'payee_nit', 'item_name'], as_index=False)
-        .agg({'total': 'mean', 'due': 'mean', 'item_sales' : 'sum'})
-    )
+    current_date = pd.Timestamp.now()
 
-    # Combine both datasets
-    sales_data = pd.concat([summarized_data, creditnote_data], ignore_index=True)
+    # Every figure on this page falls between the start of last year and today
+    window_start = pd.Timestamp(year=current_date.year - 1, month=1, day=1)
 
+    # Derived tables are shared across reruns, keyed by filter state and data version
+    results = shared_cache(config['cache']['max_bytes'])
 
-    sales_data['seller_name'] = sales_data['seller_name'].str.upper()
-    seller_names = sales_data['seller_name'].unique()
+    # The nightly batch run lists the sellers active in the window; without it
+    # the list comes from the backend
+    snapshot = data.load_todays_snapshot(config.get('snapshot_dir', 'snapshots'), 'equipo_de_ventas', 'all')
+    if snapshot and 'sellers' in snapshot['tables']:
+        seller_names = snapshot['tables']['sellers']['seller_name'].tolist()
+    else:
+        seller_names = load_seller_names(window_start.date(), current_date.date())
     default_sellers = ['ISABEL DE LEONARDO', 'BRETZY MARTINEZ', 'DELIA RODRIGUEZ']
     selected_sellers = st.multiselect(
         'Listado de Vendedores', 
         seller_names, 
         default=[seller for seller in default_sellers if seller in seller_names]
     )
-    filtered_data = sales_data[sales_data['seller_name'].isin(selected_sellers)]
-    
-    current_year = pd.Timestamp.now().year
-    filtered_data['issued_at'] = pd.to_datetime(filtered_data['issued_at'])
-    current_date = pd.Timestamp.now()
-    start_of_year = pd.Timestamp(year=current_year, month=1, day=1)
-
-    # Filter data for the current year up to today
-    current_year_data = filtered_data[
-        (filtered_data['issued_at'] >= start_of_year) & 
-        (filtered_data['issued_at'] <= current_date)
-    ]
-
-    # Filter data for the same period last year
-    previous_year_start = start_of_year - pd.DateOffset(years=1)
-    previous_year_end = current_date - pd.DateOffset(years=1)
-    previous_year_data = filtered_data[
-        (filtered_data['issued_at'] >= previous_year_start) & 
-        (filtered_data['issued_at'] <= previous_year_end)
-    ]
-
-    # Calculate YTD sales and YoY growth
-    ytd_sales = current_year_data.groupby('seller_name')['item_sales'].sum().reindex(selected_sellers, fill_value=0)
-    previous_ytd_sales = previous_year_data.groupby('seller_name')['item_sales'].sum().reindex(selected_sellers, fill_value=0)
-
-    yoy_growth = ((ytd_sales - previous_ytd_sales) / previous_ytd_sales.replace(0, np.nan)) * 100
-    yoy_growth = yoy_growth.fillna(0)  # Handle division by zero or NaN cases
-
-    ytd_sales_df = pd.DataFrame({
-        'Seller Name': ytd_sales.index, 
-        'YTD Sales': ytd_sales.values, 
-        'YoY Growth': yoy_growth.values
-    }).sort_values('Seller Name').reset_index()
+
+    # Only the selected sellers' rows are downloaded
+    seller_sales = slices.load(slices.make_slice(start=window_start, end=current_date, sellers=selected_sellers))
+    filtered_data = results.get_or_compute(
+        normalize_key('equipo_vendedores', seller_sales.version),
+        lambda: seller_sales.netted.assign(seller_name=lambda df: df['seller_name'].str.upper())
+    )
+
+    ytd_sales_df = metrics.seller_ytd(filtered_data, selected_sellers, current_date)
+
+    import plotly.express as px  # Loaded only when the seller charts render
 
     # Display metrics for each seller
     columns = st.columns(len(selected_sellers))
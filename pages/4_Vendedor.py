@@ -1 +1,158 @@
-    
\ No newline at end of file
+import streamlit as st
+import hashlib
+import pandas as pd
+import os
+import data
+import ingest
+import settings
+from tables import paged_table
+
+st.set_page_config(layout="wide")
+
+
+config = settings.load_config()
+
+if not 'authenticated' in st.session_state:
+    st.session_state.authenticated = False
+
+@st.cache_resource(ttl=config['cache']['ttl'], max_entries=config['cache']['max_entries'])
+def load_seller_index(url):
+    # Built once per data refresh and shared read-only between sessions
+    return data.build_seller_index(ingest.load_sales(url + "/sales/details").netted)
+
+
+if not st.session_state.authenticated:
+
+    with st.sidebar:
+        pwd = st.sidebar.text_input('password', type = 'password')
+        st.session_state.authenticated = hashlib.sha256(pwd.encode()).hexdigest() in config['keys']
+
+if st.session_state.authenticated:
+
+    st.title('Vendedor')
+    facts, seller_index = load_seller_index(os.getenv("BASE_URL"))
+
+    selected_seller = st.selectbox('Vendedor', seller_index.index)
+    seller_summary = seller_index.loc[selected_seller]
+
+    # Only the selected seller's rows are touched from here on
+    seller_data = data.seller_rows(facts, seller_index, selected_seller)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Venta Total", f"Q{seller_summary['total_sales']:,.2f}")
+    col2.metric("Monto por cobrar", f"Q{seller_summary['due']:,.2f}")
+    col3.metric("Facturas", f"{seller_summary['invoices']:,}")
+    col4.metric("Clientes", f"{seller_summary['clients']:,}")
+    st.caption(
+        f"Primera venta: {seller_summary['first_sale']:%Y-%m-%d} · "
+        f"Última venta: {seller_summary['last_sale']:%Y-%m-%d}"
+    )
+
+    ### TREND
+
+    import plotly.express as px  # Loaded only when the chart section renders
+
+    monthly_sales = (
+        seller_data
+        .groupby(seller_data['issued_at'].dt.to_period('M'))
+        .agg({'item_sales': 'sum'})
+        .reset_index()
+        .rename(columns={'issued_at': 'month', 'item_sales': 'monthly_total'})
+    )
+    monthly_sales['month'] = monthly_sales['month'].dt.to_timestamp()
+
+    fig = px.bar(
+        monthly_sales,
+        x='month',
+        y='monthly_total',
+        title='Ventas mensuales',
+        labels={'month': 'Mes', 'monthly_total': 'Ventas'}
+    )
+    fig.update_layout(xaxis_title="Mes", yaxis_title="Ventas", title_x=0.0)
+    st.plotly_chart(fig, use_container_width=True)
+
+    ### CLIENTS AND PRODUCTS
+
+    left_col, right_col = st.columns(2)
+
+    with left_col:
+        st.subheader("Clientes")
+        client_summary = (
+            seller_data
+            .groupby(['payee_nit', 'payee_name'], as_index=False)
+            .agg(total_sales=('item_sales', 'sum'), last_sale=('issued_at', 'max'))
+            .sort_values('total_sales', ascending=False)
+        )
+        client_summary['last_sale'] = client_summary['last_sale'].dt.strftime('%Y-%m-%d')
+        paged_table(
+            client_summary.rename(columns={
+                'payee_nit': 'NIT del Cliente',
+                'payee_name': 'Nombre del Cliente',
+                'total_sales': 'Ventas Totales',
+                'last_sale': 'Última compra'
+            }),
+            key='vendedor_clientes',
+            formats={"Ventas Totales": "Q{:,.2f}"},
+            page_size=20
+        )
+
+    with right_col:
+        st.subheader("Productos")
+        item_summary = (
+            seller_data
+            .groupby('item_name', as_index=False)
+            .agg(total_sales=('item_sales', 'sum'), clients=('payee_nit', 'nunique'))
+            .sort_values('total_sales', ascending=False)
+        )
+        paged_table(
+            item_summary.rename(columns={
+                'item_name': 'Producto',
+                'total_sales': 'Ventas Totales',
+                'clients': 'Clientes'
+            }),
+            key='vendedor_productos',
+            formats={"Ventas Totales": "Q{:,.2f}"},
+            page_size=20
+        )
+
+    ### INVOICES
+
+    invoices = (
+        seller_data
+        .groupby(['issued_at', 'invoice_number', 'payee_name'], as_index=False)
+        .agg({'item_sales': 'sum', 'due': 'mean'})
+        .sort_values('issued_at', ascending=False)
+    )
+
+    st.subheader("Facturas")
+    paged_table(
+        invoices.assign(issued_at=invoices['issued_at'].dt.strftime('%Y-%m-%d')).rename(columns={
+            'issued_at': 'Fecha emisión',
+            'invoice_number': 'No. Factura',
+            'payee_name': 'Cliente',
+            'item_sales': 'Monto',
+            'due': 'Monto por Cobrar'
+        }),
+        key='vendedor_facturas',
+        formats={"Monto": "Q{:,.2f}", "Monto por Cobrar": "Q{:,.2f}"}
+    )
+
+    ### RECEIVABLES
+
+    receivables = invoices[(invoices['item_sales'] > 0) & (invoices['due'] > 0)].sort_values(['due', 'issued_at'], ascending=[False, True])
+    receivables = receivables.assign(days_since_issue=(pd.Timestamp.today() - receivables['issued_at']).dt.days)
+
+    st.subheader("Facturas por cobrar")
+    paged_table(
+        receivables.assign(issued_at=receivables['issued_at'].dt.strftime('%Y-%m-%d'))[
+            ['issued_at', 'days_since_issue', 'invoice_number', 'payee_name', 'due']
+        ].rename(columns={
+            'issued_at': 'Fecha emisión',
+            'days_since_issue': 'Días desde emisión',
+            'invoice_number': 'No. Factura',
+            'payee_name': 'Cliente',
+            'due': 'Monto por Cobrar'
+        }),
+        key='vendedor_por_cobrar',
+        formats={"Monto por Cobrar": "Q{:,.2f}"}
+    )
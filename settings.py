@@ -0,0 +1,14 @@
+import functools
+import json
+
+from dotenv import load_dotenv
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(path='config.json'):
+    # Streamlit re-executes the page scripts on every rerun but keeps imported
+    # modules, so the .env file and config.json are only read once per process.
+    # The returned dict is shared and must not be modified.
+    load_dotenv(override=True)
+    with open(path, 'r') as file:
+        return json.load(file)
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+import data
+import ingest
+import settings
+
+
+# A slice is the part of /sales/details a page actually needs. It is sent to
+# the backend as query parameters, so narrow views only download their own
+# rows. A row belongs to a slice when:
+#   - its issued_at or creditnote_date falls within [start, end] (dates,
+#     both ends inclusive), so credit notes land in the period they net into
+#   - its seller_name (case-insensitive) is one of sellers
+#   - its item_category is one of categories
+#   - its due is positive, when due_only is set
+# None means the field is not filtered. An empty sellers or categories set
+# matches no rows at all; the backend would read an empty list as no filter,
+# so those slices are answered locally without a request. mock_api.py
+# implements the same rules.
+
+Slice = namedtuple('Slice', ['start', 'end', 'sellers', 'categories', 'due_only'])
+
+
+def make_slice(start=None, end=None, sellers=None, categories=None, due_only=False):
+    return Slice(
+        start=pd.Timestamp(start).date() if start is not None else None,
+        end=pd.Timestamp(end).date() if end is not None else None,
+        sellers=frozenset(seller.upper() for seller in sellers) if sellers is not None else None,
+        categories=frozenset(categories) if categories is not None else None,
+        due_only=bool(due_only)
+    )
+
+
+def query_params(spec):
+    params = {}
+    if spec.start is not None:
+        params['start_date'] = spec.start.isoformat()
+    if spec.end is not None:
+        params['end_date'] = spec.end.isoformat()
+    if spec.sellers is not None:
+        params['seller_name'] = sorted(spec.sellers)
+    if spec.categories is not None:
+        params['item_category'] = sorted(spec.categories)
+    if spec.due_only:
+        params['due_only'] = 'true'
+    return params
+
+
+def covers(superset, spec):
+    # True when every row of spec is also a row of superset
+    def within(outer, inner):
+        return outer is None or (inner is not None and inner <= outer)
+
+    return (
+        (superset.start is None or (spec.start is not None and spec.start >= superset.start)) and
+        (superset.end is None or (spec.end is not None and spec.end <= superset.end)) and
+        within(superset.sellers, spec.sellers) and
+        within(superset.categories, spec.categories) and
+        (not superset.due_only or spec.due_only)
+    )
+
+
+def narrow(sales, spec):
+    # Apply spec to an already downloaded superset and net the remaining rows
+    raw = sales.raw
+    version = hashlib.sha256(f'{sales.version}:{sorted(query_params(spec).items())}'.encode()).hexdigest()
+    if raw.empty:
+        return ingest.Sales(version, raw, sales.netted)
+
+    mask = pd.Series(True, index=raw.index)
+    if spec.start is not None or spec.end is not None:
+        start = pd.Timestamp(spec.start) if spec.start is not None else pd.Timestamp.min
+        end = pd.Timestamp(spec.end) + pd.Timedelta(days=1) if spec.end is not None else pd.Timestamp.max
+        in_range = lambda column: (raw[column] >= start) & (raw[column] < end)
+        mask &= in_range('issued_at') | in_range('creditnote_date')
+    if spec.sellers is not None:
+        mask &= raw['seller_name'].str.upper().isin(spec.sellers)
+    if spec.categories is not None:
+        mask &= raw['item_category'].isin(spec.categories)
+    if spec.due_only:
+        mask &= raw['due'] > 0
+
+    raw = raw[mask].reset_index(drop=True)
+    return ingest.Sales(version, raw, data.net_credit_notes(raw))
+
+
+class SliceCache:
+    # Slices already loaded, reused for any later slice they cover. Entries expire
+    # after ttl seconds and the oldest are dropped beyond max_entries.
+
+    def __init__(self, url, ttl, max_entries):
+        self.url = url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.local = 0
+        self.downloads = 0
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def get(self, spec):
+        if spec.sellers == frozenset() or spec.categories == frozenset():
+            version = hashlib.sha256(f'empty:{sorted(query_params(spec).items())}'.encode()).hexdigest()
+            return ingest.empty_sales(version)
+
+        with self._lock:
+            now = time.monotonic()
+            self._entries = [entry for entry in self._entries if now - entry[0] < self.ttl]
+            for _, cached_spec, sales in self._entries:
+                if cached_spec == spec:
+                    self.hits += 1
+                    return sales
+            supersets = [(loaded_at, sales) for loaded_at, cached_spec, sales in self._entries if covers(cached_spec, spec)]
+
+        if supersets:
+            # Filter the smallest cached superset instead of downloading again.
+            # The result is as old as the superset, so it keeps its timestamp
+            # and expires with it.
+            self.local += 1
+            loaded_at, superset = min(supersets, key=lambda entry: len(entry[1].raw))
+            sales = narrow(superset, spec)
+        else:
+            self.downloads += 1
+            loaded_at = time.monotonic()
+            sales = ingest.load_sales(self.url, params=query_params(spec))
+
+        with self._lock:
+            self._entries.append((loaded_at, spec, sales))
+            self._entries = self._entries[-self.max_entries:]
+        return sales
+
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def shared_slices(url, ttl, max_entries):
+    # One slice cache per backend URL and process
+    with _shared_lock:
+        if url not in _shared_caches:
+            _shared_caches[url] = SliceCache(url, ttl, max_entries)
+        return _shared_caches[url]
+
+
+def seller_names(start, end):
+    # Upper-cased sellers with rows between start and end. Backends without
+    # /sales/sellers send the window's rows instead; they are read for the
+    # names only and kept out of the slice cache, so later seller slices are
+    # still sent to the backend rather than narrowed from the window.
+    params = query_params(make_slice(start=start, end=end))
+    names = ingest.load_sellers(os.getenv("BASE_URL") + "/sales/sellers", params=params)
+    if names is None:
+        netted = ingest.load_sales(os.getenv("BASE_URL") + "/sales/details", params=params).netted
+        names = sorted(netted['seller_name'].dropna().str.upper().unique())
+    return names
+
+
+def load(spec):
+    # Slice of the BASE_URL backend for the pages, from the process-wide cache.
+    # Frames are shared between sessions, so they must not be modified in place.
+    config = settings.load_config()
+    return shared_slices(os.getenv("BASE_URL") + "/sales/details", config['cache']['ttl'], config['cache']['max_slices']).get(spec)
@@ -0,0 +1,187 @@
+import argparse
+import ast
+import glob
+import os
+import re
+import subprocess
+import sys
+
+import settings
+
+
+# Import-time report for the app entry points. Each page's module-level
+# imports are timed in a fresh interpreter with `python -X importtime`, the
+# same cold start a dyno pays before it can serve the first page. Imports
+# nested inside the page or the local modules it uses (loaded only when a
+# section renders) are timed separately as deferred cost.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def entry_points():
+    return ['ibiomed.py'] + sorted(glob.glob(os.path.join('pages', '*.py')))
+
+
+def _imported(node):
+    # Module names imported by one statement
+    if isinstance(node, ast.Import):
+        return [alias.name for alias in node.names]
+    if isinstance(node, ast.ImportFrom) and node.module:
+        return [node.module]
+    return []
+
+
+def _local_module(module):
+    path = module.split('.')[0] + '.py'
+    return path if os.path.exists(os.path.join(ROOT, path)) else None
+
+
+def _parse(path):
+    with open(os.path.join(ROOT, path), 'r') as file:
+        tree = ast.parse(file.read(), filename=path)
+
+    # Names that refer to local modules or to functions imported from them
+    names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if _local_module(alias.name):
+                    names[alias.asname or alias.name] = (alias.name, None)
+        elif isinstance(node, ast.ImportFrom) and node.module and _local_module(node.module):
+            for alias in node.names:
+                names[alias.asname or alias.name] = (node.module, alias.name)
+
+    functions = {node.name: node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    return tree, names, functions
+
+
+def _calls(node, names, module=None, functions=()):
+    # (module, function) pairs of local functions referenced under node
+    calls = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Attribute) and isinstance(child.value, ast.Name):
+            target = names.get(child.value.id)
+            if target and target[1] is None:
+                calls.add((target[0], child.attr))
+        elif isinstance(child, ast.Name):
+            target = names.get(child.id)
+            if target and target[1] is not None:
+                calls.add(target)
+            elif child.id in functions:
+                calls.add((module, child.id))
+    return calls
+
+
+def page_imports(path):
+    # Returns the imports a page pays for at startup and the deferred ones.
+    # Local modules are followed: third-party modules they import at module
+    # level come first, in source order, and the local modules after their own
+    # dependencies, so every module is timed on its own instead of absorbing
+    # pandas or plotly. Imports nested in a local function are deferred cost
+    # only when the page, directly or through other local functions, refers to
+    # that function; a local module imported lazily defers everything it imports.
+    page_tree, page_names, _ = _parse(path)
+    third_party = []
+    local = []
+    modules = {}
+
+    def load(current):
+        tree, _, _ = modules[current] = _parse(current)
+        for module in (module for node in tree.body for module in _imported(node)):
+            local_path = _local_module(module)
+            if local_path is None:
+                if module not in third_party:
+                    third_party.append(module)
+            elif local_path not in modules:
+                load(local_path)
+                local.append(module)
+
+    load(path)
+    module_level = third_party + local
+
+    deferred = set()
+    lazy_locals = set()
+    for node in ast.walk(page_tree):
+        if node not in page_tree.body:
+            deferred.update(_imported(node))
+
+    pending = list(_calls(page_tree, page_names))
+    followed = set()
+    while pending:
+        module, function = pending.pop()
+        local_path = _local_module(module)
+        if (module, function) in followed or local_path not in modules:
+            continue
+        followed.add((module, function))
+        _, names, functions = modules[local_path]
+        if function in functions:
+            node = functions[function]
+            deferred.update(name for child in ast.walk(node) for name in _imported(child))
+            pending += _calls(node, names, module, functions)
+
+    for module in list(deferred):
+        local_path = _local_module(module)
+        if local_path and local_path not in modules and local_path not in lazy_locals:
+            lazy_locals.add(local_path)
+            tree, _, _ = _parse(local_path)
+            deferred.update(name for node in ast.walk(tree) for name in _imported(node))
+
+    return module_level, sorted(deferred - set(module_level))
+
+
+def measure(modules, already_imported=()):
+    # Returns {top level module: cumulative microseconds}
+    if not modules:
+        return {}
+    preamble = ''.join(f'import {module}\n' for module in already_imported)
+    statement = preamble + "import sys; sys.stderr.write('--\\n')\n" + ''.join(f'import {module}\n' for module in modules)
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Only count what is imported after the marker, so deferred imports are
+    # measured on top of what the page already loaded
+    stderr = result.stderr.split('--\n', 1)[-1]
+    timings = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match and not match.group(3):
+            timings[match.group(4)] = int(match.group(2))
+    return timings
+
+
+def main():
+    config = settings.load_config()
+    parser = argparse.ArgumentParser(description='Report import time for each page')
+    parser.add_argument('--budget', type=float, default=config['startup']['import_budget_ms'], help='import budget per page in milliseconds')
+    parser.add_argument('--top', type=int, default=5, help='number of slowest imports to list per page')
+    args = parser.parse_args()
+
+    over_budget = []
+    for path in entry_points():
+        module_level, deferred = page_imports(path)
+        eager = measure(module_level)
+        lazy = measure(deferred, already_imported=module_level)
+        eager_ms = sum(eager.values()) / 1000
+        lazy_ms = sum(lazy.values()) / 1000
+
+        status = 'ok' if eager_ms <= args.budget else 'OVER BUDGET'
+        print(f'{path}: {eager_ms:,.0f} ms at startup, {lazy_ms:,.0f} ms deferred (budget {args.budget:,.0f} ms) {status}')
+        for module, microseconds in sorted(eager.items(), key=lambda item: -item[1])[:args.top]:
+            print(f'    {module:<30} {microseconds / 1000:>8,.1f} ms')
+        for module, microseconds in sorted(lazy.items(), key=lambda item: -item[1])[:args.top]:
+            print(f'    {module:<30} {microseconds / 1000:>8,.1f} ms (deferred)')
+
+        if eager_ms > args.budget:
+            over_budget.append(path)
+
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
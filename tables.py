@@ -0,0 +1,59 @@
+import math
+
+import streamlit as st
+
+
+def paged_table(data, key, formats=None, style=None, page_size=50, height=None):
+    # Sort, search and paginate on the server and only send the visible page.
+    # Formatting (and any extra styling) is applied to that page alone, so the
+    # payload stays the same size no matter how many rows `data` has.
+    formats = formats or {}
+
+    search_col, sort_col, order_col, page_col = st.columns([3, 2, 1, 1])
+
+    with search_col:
+        search = st.text_input('Buscar', key=f'{key}_search')
+
+    with sort_col:
+        sort_by = st.selectbox(
+            'Ordenar por',
+            options=[None] + list(data.columns),
+            format_func=lambda col: '—' if col is None else col,
+            key=f'{key}_sort'
+        )
+
+    with order_col:
+        ascending = st.toggle('Ascendente', value=False, key=f'{key}_ascending')
+
+    if search:
+        text_columns = data.select_dtypes(include=['object', 'string']).columns
+        mask = None
+        for col in text_columns:
+            col_mask = data[col].astype(str).str.contains(search, case=False, regex=False)
+            mask = col_mask if mask is None else mask | col_mask
+        if mask is not None:
+            data = data[mask]
+
+    if sort_by is not None:
+        data = data.sort_values(sort_by, ascending=ascending, kind='stable')
+
+    n_rows = len(data)
+    n_pages = max(1, math.ceil(n_rows / page_size))
+
+    # Keep the page selector in range when a search shrinks the table
+    page_key = f'{key}_page'
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+
+    with page_col:
+        page = st.number_input('Página', min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    page_data = data.iloc[start:start + page_size]
+
+    styled = page_data.style.format(formats)
+    if style is not None:
+        styled = style(styled)
+
+    st.dataframe(styled, use_container_width=True, hide_index=True, height=height)
+    st.caption(f'{n_rows:,} filas · página {page} de {n_pages}')